@@ -58,10 +58,11 @@ class Player(Character):
 
 class NPC(Character):
     """非玩家角色"""
+    SYMBOLS = ['☺', '☻', '♠', '♥', '♦', '♣']
+    COLORS = ['light red', 'light magenta', 'light cyan']
+
     def __init__(self, name, x, y):
-        symbols = ['☺', '☻', '♠', '♥', '♦', '♣']
-        colors = ['light red', 'light magenta', 'light cyan']
-        super().__init__(name, random.choice(symbols), random.choice(colors), x, y)
+        super().__init__(name, random.choice(self.SYMBOLS), random.choice(self.COLORS), x, y)
     
     def random_move(self, game_world):
         """NPC随机移动"""
@@ -71,14 +72,15 @@ class NPC(Character):
 
 class City:
     """城市类"""
+    symbol = '◙'
+    color = 'light blue'
+
     def __init__(self, name, x, y, width=3, height=2):
         self.name = name
         self.x = x
         self.y = y
         self.width = width
         self.height = height
-        self.symbol = '◙'
-        self.color = 'light blue'
     
     def contains(self, x, y):
         """检查坐标是否在城市范围内"""
@@ -121,7 +123,7 @@ class GameWorld:
             terrain = random.choices(
                 list(terrain_weights.keys()), 
                 weights=list(terrain_weights.values())
-            )
+            )[0]
             game_map[y][x] = Tile(terrain)
         
         return game_map
@@ -284,8 +286,8 @@ class GameDisplay(urwid.WidgetWrap):
 # ======================
 # 主函数
 # ======================
-def main():
-    # 创建调色板
+def build_palette():
+    """创建调色板"""
     palette = [
         ('bg', 'black', 'black'),
         ('status', 'white', 'dark blue'),
@@ -306,6 +308,12 @@ def main():
         if terrain.color not in [p for p in palette]:
             palette.append((terrain.color, terrain.color, 'black'))
     
+    return palette
+
+def main():
+    # 创建调色板
+    palette = build_palette()
+    
     # 创建游戏界面
     game = GameDisplay()
     
@@ -0,0 +1,750 @@
+#!/usr/bin/env python3
+"""
+无界面服务器模式
+
+GameWorld 在独立进程中运行，通过 Unix 域套接字为一个或多个 urwid 客户端服务。
+每个回合只发送与客户端视口相关的增量（实体移动、变化的格子、数值变化），
+使用紧凑的二进制编码，而不是完整的状态。
+
+用法：
+    python server.py serve  [--socket PATH] [--seed N] [--tick 秒]
+    python server.py client [--socket PATH] [--full]
+    python server.py bench  [--ticks N]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import selectors
+import socket
+import stat
+import statistics
+import struct
+import tempfile
+import time
+
+import urwid
+
+from game import TERRAIN_TYPES, NPC, City, GameWorld, build_palette
+
+# ======================
+# 协议定义
+# ======================
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'urwid-bannerlord.sock')
+
+# 每条消息前有一个4字节长度前缀，消息体第一个字节为消息类型
+LENGTH = struct.Struct('<I')
+MSG_WORLD = 1   # 服务器 -> 客户端：世界尺寸
+MSG_FRAME = 2   # 服务器 -> 客户端：一个回合的状态
+MSG_HELLO = 3   # 客户端 -> 服务器：同步模式与视口大小
+MSG_INPUT = 4   # 客户端 -> 服务器：按键
+
+WORLD = struct.Struct('<BHH')           # 类型, 宽, 高
+HELLO = struct.Struct('<BBHH')          # 类型, 模式, 视口宽, 视口高
+INPUT = struct.Struct('<BB')            # 类型, 按键
+FRAME_HEAD = struct.Struct('<BIqBHHH')  # 类型, 回合, 时间戳(ns), 标志, 格子段数, 实体更新数, 实体删除数
+VIEW = struct.Struct('<HHHH')           # start_x, start_y, end_x, end_y
+STATS = struct.Struct('<IhHHB')         # 回合数, HP, 玩家x, 玩家y, 玩家所在地形
+RUN = struct.Struct('<HHH')             # 一段连续格子: x, y, 长度，后接每格1字节编码
+ENTITY = struct.Struct('<HHHB')         # 实体id, x, y, 外观编码
+REMOVE = struct.Struct('<H')            # 实体id
+
+# 客户端消息的固定长度，长度不符的消息视为非法
+CLIENT_MESSAGES = {
+    MSG_HELLO: HELLO,
+    MSG_INPUT: INPUT,
+}
+MAX_CLIENT_MESSAGE = max(layout.size for layout in CLIENT_MESSAGES.values())
+
+# 帧标志
+F_VIEW = 1    # 视口发生变化
+F_STATS = 2   # 数值发生变化
+F_RESET = 4   # 完整快照：客户端先清空实体
+
+# 单个客户端发送缓冲区上限，超过后跳过该客户端的帧
+MAX_BACKLOG = 64 * 1024
+
+# 同步模式
+MODE_DELTA = 0
+MODE_FULL = 1   # 每回合发送完整视口快照，作为对比基线
+
+# 按键对应的移动方向
+KEY_MOVES = {
+    'w': (0, -1),
+    's': (0, 1),
+    'a': (-1, 0),
+    'd': (1, 0),
+}
+
+# 格子外观表：地形按 TERRAIN_TYPES 顺序编码，城市位于最后
+TERRAIN_LIST = list(TERRAIN_TYPES.values())
+TERRAIN_CODES = {terrain: i for i, terrain in enumerate(TERRAIN_LIST)}
+TILE_GLYPHS = [(t.symbol, t.color) for t in TERRAIN_LIST] + [(City.symbol, City.color)]
+CITY_CODE = len(TERRAIN_LIST)
+UNKNOWN = 0xFF  # 客户端尚未收到的格子
+
+# 实体外观表：0号为玩家，其余为NPC符号与颜色的组合
+ENTITY_GLYPHS = [('@', 'player')] + [(s, c) for s in NPC.SYMBOLS for c in NPC.COLORS]
+ENTITY_CODES = {glyph: i for i, glyph in enumerate(ENTITY_GLYPHS)}
+PLAYER_GLYPH = ENTITY_CODES[('@', 'player')]
+PLAYER_ID = 0
+
+
+class FrameReader:
+    """按长度前缀切分字节流"""
+    def __init__(self, max_size=None):
+        self.buffer = bytearray()
+        self.max_size = max_size    # 单条消息的最大长度，None 表示不限制
+
+    def feed(self, data):
+        """追加数据，返回所有完整的消息；声明的长度超过上限时抛出 ValueError"""
+        self.buffer += data
+        messages = []
+        while len(self.buffer) >= LENGTH.size:
+            (size,) = LENGTH.unpack_from(self.buffer)
+            if self.max_size is not None and size > self.max_size:
+                raise ValueError(f"消息长度 {size} 超过上限 {self.max_size}")
+            end = LENGTH.size + size
+            if len(self.buffer) < end:
+                break
+            messages.append(bytes(self.buffer[LENGTH.size:end]))
+            del self.buffer[:end]
+        return messages
+
+
+def pack_message(payload):
+    """为消息加上长度前缀"""
+    return LENGTH.pack(len(payload)) + payload
+
+
+def build_tile_codes(world):
+    """计算整张地图的格子编码（地形 + 城市）"""
+    codes = bytearray(world.width * world.height)
+    for y in range(world.height):
+        for x in range(world.width):
+            codes[y * world.width + x] = TERRAIN_CODES[world.map[y][x].terrain]
+    for city in world.cities:
+        for y in range(city.y, min(world.height, city.y + city.height)):
+            for x in range(city.x, min(world.width, city.x + city.width)):
+                codes[y * world.width + x] = CITY_CODE
+    return codes
+
+# ======================
+# 服务器
+# ======================
+class ClientSession:
+    """服务器端记录的单个客户端状态"""
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = FrameReader(MAX_CLIENT_MESSAGE)
+        self.outbuf = bytearray()
+        self.ready = False
+        self.mode = MODE_DELTA
+        self.view_width = 0
+        self.view_height = 0
+        self.known = None           # 客户端已知的格子编码
+        self.sent_entities = {}     # 实体id -> (x, y, 外观)
+        self.sent_view = None
+        self.sent_stats = None
+
+    def hello(self, payload, world):
+        """处理客户端握手；重复握手时客户端会重建镜像，已发送的状态全部作废"""
+        _, mode, self.view_width, self.view_height = HELLO.unpack(payload)
+        if mode not in (MODE_DELTA, MODE_FULL):
+            raise ValueError(f"未知的同步模式: {mode}")
+        self.mode = mode
+        self.known = bytearray([UNKNOWN]) * (world.width * world.height)
+        self.sent_entities = {}
+        self.sent_view = None
+        self.sent_stats = None
+        self.ready = True
+
+    def visible_entities(self, world, view):
+        """获取视口内的实体"""
+        start_x, start_y, end_x, end_y = view
+        entities = {}
+        for i, npc in enumerate(world.npcs, 1):
+            if start_x <= npc.x < end_x and start_y <= npc.y < end_y:
+                entities[i] = (npc.x, npc.y, ENTITY_CODES[(npc.symbol, npc.color)])
+        player = world.player
+        if start_x <= player.x < end_x and start_y <= player.y < end_y:
+            entities[PLAYER_ID] = (player.x, player.y, PLAYER_GLYPH)
+        return entities
+
+    def build_frame(self, world, tile_codes, tick, timestamp):
+        """编码本回合发送给该客户端的数据"""
+        full = self.mode == MODE_FULL
+        flags = F_RESET if full else 0
+        sections = []
+
+        # 视口
+        view = world.get_visible_map(self.view_width, self.view_height)
+        if full or view != self.sent_view:
+            flags |= F_VIEW
+            sections.append(VIEW.pack(*view))
+            self.sent_view = view
+
+        # 数值
+        player = world.player
+        stats = (world.turn_count, player.hp, player.x, player.y,
+                 TERRAIN_CODES[world.map[player.y][player.x].terrain])
+        if full or stats != self.sent_stats:
+            flags |= F_STATS
+            sections.append(STATS.pack(*stats))
+            self.sent_stats = stats
+
+        # 格子：与客户端已知内容比较，只发送变化的连续段
+        start_x, start_y, end_x, end_y = view
+        width = world.width
+        runs = []
+        for y in range(start_y, end_y):
+            lo, hi = y * width + start_x, y * width + end_x
+            row = tile_codes[lo:hi]
+            if full:
+                runs.append(RUN.pack(start_x, y, len(row)) + row)
+            elif self.known[lo:hi] != row:
+                known = self.known
+                x = 0
+                while x < len(row):
+                    if known[lo + x] == row[x]:
+                        x += 1
+                        continue
+                    run_start = x
+                    while x < len(row) and known[lo + x] != row[x]:
+                        x += 1
+                    runs.append(RUN.pack(start_x + run_start, y, x - run_start) + row[run_start:x])
+            self.known[lo:hi] = row
+
+        # 实体
+        entities = self.visible_entities(world, view)
+        if full:
+            upserts = list(entities.items())
+            removes = []
+        else:
+            upserts = [(i, e) for i, e in entities.items() if self.sent_entities.get(i) != e]
+            removes = [i for i in self.sent_entities if i not in entities]
+        self.sent_entities = entities
+
+        head = FRAME_HEAD.pack(MSG_FRAME, tick, timestamp, flags,
+                               len(runs), len(upserts), len(removes))
+        return b''.join([head] + sections + runs +
+                        [ENTITY.pack(i, *e) for i, e in upserts] +
+                        [REMOVE.pack(i) for i in removes])
+
+    def send(self, payload):
+        """写入发送缓冲区并尽量发送"""
+        self.outbuf += pack_message(payload)
+        self.flush()
+
+    def flush(self):
+        """发送缓冲区中的数据，返回是否已全部发送"""
+        try:
+            sent = self.sock.send(self.outbuf)
+        except BlockingIOError:
+            sent = 0
+        del self.outbuf[:sent]
+        return not self.outbuf
+
+
+class GameServer:
+    """在独立进程中运行游戏世界，并向客户端推送增量"""
+    def __init__(self, path, world=None, tick_interval=0.1):
+        self.path = path
+        self.world = world or GameWorld()
+        self.tile_codes = build_tile_codes(self.world)
+        self.tick_interval = tick_interval
+        self.tick_count = 0
+        self.pending_moves = []
+        self.sessions = {}
+        self.selector = selectors.DefaultSelector()
+        self.running = False
+
+    def serve_forever(self):
+        """主循环：处理网络事件，并按固定间隔推进回合"""
+        self.remove_stale_socket()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen()
+        listener.setblocking(False)
+        self.selector.register(listener, selectors.EVENT_READ)
+        self.running = True
+
+        next_tick = time.monotonic()
+        try:
+            while self.running:
+                timeout = max(0.0, next_tick - time.monotonic())
+                for key, mask in self.selector.select(timeout):
+                    if key.fileobj is listener:
+                        self.accept(listener)
+                    else:
+                        self.handle_event(key.fileobj, mask)
+                now = time.monotonic()
+                if now >= next_tick:
+                    self.tick()
+                    next_tick = max(next_tick + self.tick_interval, now)
+        finally:
+            for session in list(self.sessions.values()):
+                self.disconnect(session)
+            self.selector.unregister(listener)
+            listener.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def remove_stale_socket(self):
+        """删除已停止的服务器遗留的套接字文件，若已有服务器在运行则报错"""
+        if not os.path.exists(self.path):
+            return
+        if not stat.S_ISSOCK(os.stat(self.path).st_mode):
+            raise RuntimeError(f"{self.path} 已存在且不是套接字文件")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except ConnectionRefusedError:
+            os.unlink(self.path)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"已有服务器在 {self.path} 上运行")
+
+    def accept(self, listener):
+        """接受新客户端"""
+        sock, _ = listener.accept()
+        sock.setblocking(False)
+        session = ClientSession(sock)
+        self.sessions[sock] = session
+        self.selector.register(sock, selectors.EVENT_READ)
+
+    def disconnect(self, session):
+        """断开客户端"""
+        self.selector.unregister(session.sock)
+        session.sock.close()
+        del self.sessions[session.sock]
+
+    def handle_event(self, sock, mask):
+        """处理客户端套接字上的读写事件"""
+        session = self.sessions[sock]
+        try:
+            if mask & selectors.EVENT_WRITE and session.flush():
+                self.selector.modify(sock, selectors.EVENT_READ)
+            if not mask & selectors.EVENT_READ:
+                return
+            data = sock.recv(4096)
+        except ConnectionError:
+            data = b''
+        if not data:
+            self.disconnect(session)
+            return
+        try:
+            payloads = session.reader.feed(data)
+        except ValueError:
+            # 声明的长度超过任何客户端消息，不再缓冲，直接断开
+            self.disconnect(session)
+            return
+        for payload in payloads:
+            if sock not in self.sessions:
+                break
+            self.handle_message(session, payload)
+
+    def handle_message(self, session, payload):
+        """处理客户端消息，非法消息只断开发送它的客户端"""
+        layout = CLIENT_MESSAGES.get(payload[0]) if payload else None
+        if layout is None or len(payload) != layout.size:
+            self.disconnect(session)
+            return
+        try:
+            if payload[0] == MSG_HELLO:
+                session.hello(payload, self.world)
+                self.send(session, WORLD.pack(MSG_WORLD, self.world.width, self.world.height))
+            elif session.ready:
+                _, key = INPUT.unpack(payload)
+                move = KEY_MOVES.get(chr(key))
+                if move:
+                    self.pending_moves.append(move)
+        except (struct.error, ValueError):
+            self.disconnect(session)
+
+    def send(self, session, payload):
+        """发送消息，未发完的部分等待可写事件"""
+        try:
+            session.send(payload)
+        except ConnectionError:
+            self.disconnect(session)
+            return
+        if session.outbuf:
+            self.selector.modify(session.sock, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    def tick(self):
+        """推进一个回合并向所有客户端发送状态"""
+        for dx, dy in self.pending_moves:
+            self.world.move_player(dx, dy)
+        self.pending_moves.clear()
+        self.tick_count += 1
+
+        timestamp = time.monotonic_ns()
+        for session in list(self.sessions.values()):
+            if not session.ready:
+                continue
+            if len(session.outbuf) > MAX_BACKLOG:
+                # 客户端没有读取数据，跳过本帧，避免缓冲区无限增长。
+                # 跳过的帧不会调用 build_frame，已发送状态仍与缓冲区末尾一致，
+                # 下一帧的增量会包含期间的全部变化
+                continue
+            frame = session.build_frame(self.world, self.tile_codes,
+                                        self.tick_count, timestamp)
+            self.send(session, frame)
+
+
+def run_server(path, seed=None, tick_interval=0.1):
+    """启动服务器（也用作子进程入口）"""
+    if seed is not None:
+        random.seed(seed)
+    GameServer(path, tick_interval=tick_interval).serve_forever()
+
+# ======================
+# 客户端
+# ======================
+class WorldMirror:
+    """客户端保存的世界镜像，由服务器发送的帧更新"""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.tiles = bytearray([UNKNOWN]) * (width * height)
+        self.entities = {}
+        self.view = (0, 0, 0, 0)
+        self.turn_count = 0
+        self.hp = 0
+        self.player_pos = (0, 0)
+        self.player_terrain = 0
+        self.dirty_rows = set()     # 上次重绘后改动过的行
+        self.dirty_all = False      # 上次重绘后需要重绘整个视口
+
+    def apply(self, payload):
+        """应用一帧，返回 (回合, 服务器时间戳)"""
+        _, tick, timestamp, flags, n_runs, n_upserts, n_removes = \
+            FRAME_HEAD.unpack_from(payload)
+        offset = FRAME_HEAD.size
+
+        if flags & F_RESET:
+            self.entities.clear()
+            self.dirty_all = True
+        if flags & F_VIEW:
+            view = VIEW.unpack_from(payload, offset)
+            self.dirty_all = self.dirty_all or view != self.view
+            self.view = view
+            offset += VIEW.size
+        if flags & F_STATS:
+            self.turn_count, self.hp, x, y, self.player_terrain = \
+                STATS.unpack_from(payload, offset)
+            self.player_pos = (x, y)
+            offset += STATS.size
+
+        for _ in range(n_runs):
+            x, y, length = RUN.unpack_from(payload, offset)
+            offset += RUN.size
+            lo = y * self.width + x
+            self.tiles[lo:lo + length] = payload[offset:offset + length]
+            self.dirty_rows.add(y)
+            offset += length
+
+        for _ in range(n_upserts):
+            entity_id, x, y, glyph = ENTITY.unpack_from(payload, offset)
+            if entity_id in self.entities:
+                self.dirty_rows.add(self.entities[entity_id][1])
+            self.entities[entity_id] = (x, y, glyph)
+            self.dirty_rows.add(y)
+            offset += ENTITY.size
+
+        for _ in range(n_removes):
+            (entity_id,) = REMOVE.unpack_from(payload, offset)
+            removed = self.entities.pop(entity_id, None)
+            if removed:
+                self.dirty_rows.add(removed[1])
+            offset += REMOVE.size
+
+        return tick, timestamp
+
+    def take_dirty(self):
+        """取出并清空需要重绘的行，返回 (是否全部重绘, 行集合)"""
+        dirty = (self.dirty_all, self.dirty_rows)
+        self.dirty_all = False
+        self.dirty_rows = set()
+        return dirty
+
+    def occupants(self):
+        """实体所在位置 -> (符号, 颜色)，与 render_tile 一致：玩家优先，其次是编号小的NPC"""
+        occupants = {}
+        for entity_id in sorted(self.entities, reverse=True):
+            x, y, glyph = self.entities[entity_id]
+            occupants[(x, y)] = ENTITY_GLYPHS[glyph]
+        return occupants
+
+    def compose_row(self, y, occupants):
+        """生成视口中一行的 (符号, 颜色) 列表，实体优先于地形"""
+        start_x, _, end_x, _ = self.view
+        row = []
+        for x in range(start_x, end_x):
+            glyph = occupants.get((x, y))
+            if glyph is None:
+                code = self.tiles[y * self.width + x]
+                glyph = TILE_GLYPHS[code] if code != UNKNOWN else (' ', 'bg')
+            row.append(glyph)
+        return row
+
+
+class RemoteClient:
+    """连接服务器的客户端"""
+    def __init__(self, path, view_width=80, view_height=24, mode=MODE_DELTA):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.reader = FrameReader()
+        self.mirror = None
+        self.sock.sendall(pack_message(HELLO.pack(MSG_HELLO, mode, view_width, view_height)))
+
+    def send_key(self, key):
+        """发送按键"""
+        self.sock.sendall(pack_message(INPUT.pack(MSG_INPUT, ord(key))))
+
+    def read_messages(self):
+        """读取已到达的数据，返回其中完整的消息（尚未应用）"""
+        data = self.sock.recv(65536)
+        if not data:
+            raise ConnectionError("服务器已断开")
+        return self.reader.feed(data)
+
+    def apply_message(self, payload):
+        """应用一条消息；若是帧则返回 (回合, 服务器时间戳, 字节数)，否则返回 None"""
+        kind = payload[0]
+        if kind == MSG_WORLD:
+            _, width, height = WORLD.unpack(payload)
+            self.mirror = WorldMirror(width, height)
+        elif kind == MSG_FRAME:
+            tick, timestamp = self.mirror.apply(payload)
+            return tick, timestamp, LENGTH.size + len(payload)
+        return None
+
+    def poll(self):
+        """读取并应用已到达的消息，返回本次应用的帧 [(回合, 服务器时间戳, 字节数)]"""
+        frames = []
+        for payload in self.read_messages():
+            frame = self.apply_message(payload)
+            if frame:
+                frames.append(frame)
+        return frames
+
+    def close(self):
+        self.sock.close()
+
+
+class RemoteDisplay(urwid.WidgetWrap):
+    """远程游戏界面，地图每行使用一个Text部件"""
+    def __init__(self, client):
+        self.client = client
+
+        # 创建地图显示部件
+        self.map_walker = urwid.SimpleListWalker([])
+        self.map_listbox = urwid.ListBox(self.map_walker)
+
+        # 创建状态栏
+        self.status_text = urwid.Text("正在连接服务器...")
+        self.status_bar = urwid.AttrMap(self.status_text, 'status')
+
+        # 创建主框架
+        self.frame = urwid.Frame(
+            body=urwid.AttrMap(self.map_listbox, 'bg'),
+            footer=self.status_bar
+        )
+
+        super().__init__(self.frame)
+
+    def on_readable(self):
+        """套接字可读时由主循环调用"""
+        try:
+            frames = self.client.poll()
+        except ConnectionError:
+            raise urwid.ExitMainLoop()
+        if frames:
+            self.refresh_map()
+            self.update_status()
+
+    def refresh_map(self):
+        """刷新地图显示：每行一个Text部件，只重绘上次刷新后改动过的行"""
+        mirror = self.client.mirror
+        _, start_y, _, end_y = mirror.view
+        dirty_all, dirty_rows = mirror.take_dirty()
+        if len(self.map_walker) != end_y - start_y:
+            del self.map_walker[:]
+            rows = range(start_y, end_y)
+        elif dirty_all:
+            rows = range(start_y, end_y)
+        else:
+            rows = sorted(y for y in dirty_rows if start_y <= y < end_y)
+        if not rows:
+            return
+
+        occupants = mirror.occupants()
+        for y in rows:
+            markup = [(color_attr, symbol) for symbol, color_attr
+                      in mirror.compose_row(y, occupants)]
+            if y - start_y < len(self.map_walker):
+                self.map_walker[y - start_y].set_text(markup)
+            else:
+                self.map_walker.append(urwid.Text(markup, wrap='clip'))
+
+    def update_status(self):
+        """更新状态栏信息"""
+        mirror = self.client.mirror
+        x, y = mirror.player_pos
+        status = (
+            f"回合: {mirror.turn_count} | 位置: ({x}, {y}) | "
+            f"HP: {mirror.hp} | 地形: {TERRAIN_LIST[mirror.player_terrain].name}"
+        )
+        self.status_text.set_text(status)
+
+    def keypress(self, size, key):
+        """处理键盘输入"""
+        if key in KEY_MOVES:
+            try:
+                self.client.send_key(key)
+            except ConnectionError:
+                raise urwid.ExitMainLoop()
+            return None
+        if key == 'q':
+            raise urwid.ExitMainLoop()
+        return key
+
+
+def run_client(path, full=False):
+    """启动 urwid 客户端"""
+    client = RemoteClient(path, mode=MODE_FULL if full else MODE_DELTA)
+    display = RemoteDisplay(client)
+    loop = urwid.MainLoop(display, build_palette(), handle_mouse=False)
+    loop.watch_file(client.sock.fileno(), display.on_readable)
+    try:
+        loop.run()
+    finally:
+        client.close()
+
+# ======================
+# 性能对比
+# ======================
+def measure(mode, ticks, seed, tick_interval, view_width, view_height, startup_timeout=10.0):
+    """在独立的服务器进程上测量每回合字节数和客户端帧延迟"""
+    workdir = tempfile.TemporaryDirectory()
+    path = os.path.join(workdir.name, 'bench.sock')
+    server = multiprocessing.Process(target=run_server, args=(path, seed, tick_interval),
+                                     daemon=True)
+    server.start()
+    client = None
+    sizes, apply_ms, frame_ms = [], [], []
+    try:
+        # 套接字文件在 bind() 时就已出现，要一直重试连接直到服务器开始 listen()
+        deadline = time.monotonic() + startup_timeout
+        while client is None:
+            try:
+                client = RemoteClient(path, view_width, view_height, mode)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if not server.is_alive():
+                    raise RuntimeError(f"服务器进程启动失败，退出码 {server.exitcode}")
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{startup_timeout} 秒内无法连接服务器")
+                time.sleep(0.01)
+
+        display = RemoteDisplay(client)
+        keys = random.Random(seed)
+        while len(sizes) < ticks:
+            # 同一次 recv 可能收到多帧，逐帧应用并计时，避免后一帧的开销算进前一帧
+            for payload in client.read_messages():
+                frame = client.apply_message(payload)
+                if frame is None:
+                    continue
+                _, timestamp, size = frame
+                applied = time.monotonic_ns()
+                # 与真实客户端相同：更新部件并渲染到画布
+                display.refresh_map()
+                display.update_status()
+                display.render((view_width, view_height + 1))
+                rendered = time.monotonic_ns()
+                sizes.append(size)
+                apply_ms.append((applied - timestamp) / 1e6)
+                frame_ms.append((rendered - timestamp) / 1e6)
+                client.send_key(keys.choice(list(KEY_MOVES)))
+    finally:
+        if client is not None:
+            client.close()
+        server.terminate()
+        server.join()
+        workdir.cleanup()
+    return sizes[:ticks], apply_ms[:ticks], frame_ms[:ticks]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_bench(ticks=200, seed=2025, tick_interval=0.1, view_width=80, view_height=24):
+    """对比增量同步与完整快照"""
+    print(f"{ticks} 回合, 视口 {view_width}x{view_height}, 回合间隔 {tick_interval * 1000:.0f}ms")
+    print(f"{'模式':<8}{'首帧字节':>10}{'平均字节/回合':>16}{'总字节':>10}"
+          f"{'应用p50(ms)':>14}{'帧p50(ms)':>12}{'帧p95(ms)':>12}")
+    results = {}
+    for name, mode in (('full', MODE_FULL), ('delta', MODE_DELTA)):
+        sizes, apply_ms, frame_ms = measure(mode, ticks, seed, tick_interval,
+                                            view_width, view_height)
+        # 首帧总是完整视口，单独列出，不计入平均值
+        steady = sizes[1:]
+        results[name] = statistics.mean(steady)
+        print(f"{name:<8}{sizes[0]:>10}{results[name]:>16.1f}{sum(sizes):>10}"
+              f"{statistics.median(apply_ms):>14.3f}{statistics.median(frame_ms):>12.3f}"
+              f"{percentile(frame_ms, 0.95):>12.3f}")
+    print(f"增量/快照 字节比: {results['delta'] / results['full']:.3f}")
+
+# ======================
+# 主函数
+# ======================
+def bench_ticks(value):
+    """bench 的回合数：首帧单独统计，至少还需要一帧计算平均值"""
+    ticks = int(value)
+    if ticks < 2:
+        raise argparse.ArgumentTypeError("回合数至少为 2")
+    return ticks
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面服务器模式")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="启动服务器")
+    serve.add_argument('--socket', default=DEFAULT_SOCKET)
+    serve.add_argument('--seed', type=int)
+    serve.add_argument('--tick', type=float, default=0.1, help="回合间隔（秒）")
+
+    client = commands.add_parser('client', help="启动客户端")
+    client.add_argument('--socket', default=DEFAULT_SOCKET)
+    client.add_argument('--full', action='store_true', help="每回合接收完整快照")
+
+    bench = commands.add_parser('bench', help="对比增量同步与完整快照")
+    bench.add_argument('--ticks', type=bench_ticks, default=200)
+    bench.add_argument('--seed', type=int, default=2025)
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        try:
+            run_server(args.socket, args.seed, args.tick)
+        except RuntimeError as e:
+            parser.exit(1, f"{e}\n")
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'client':
+        try:
+            run_client(args.socket, args.full)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            parser.exit(1, f"无法连接服务器 {args.socket}: {e.strerror}\n")
+    else:
+        run_bench(args.ticks, args.seed)
+
+if __name__ == '__main__':
+    main()